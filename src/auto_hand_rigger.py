@@ -1,7 +1,10 @@
 import maya.cmds as cmds
-import maya.app.general.positionAlongCurve as pos
 import math as m
+import os
 import re
+import json
+import time
+import importlib
 from functools import wraps
 
 '''   
@@ -52,6 +55,74 @@ def componentErrorDecorator(fn):
             print( 'Incorrect geometry type. Please select object component' )
     return wrapper   
 
+#-------------------------TIMING-----------------------
+debugTimings = False
+#set to True to print and keep the timings of startup and tool switching.
+timings = {}
+
+def timedDecorator(fn):
+    '''
+        times each call while debugTimings is set, keeping the last
+        hundred timings of each function.
+    '''
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not debugTimings:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        calls = timings.setdefault(fn.__name__, [])
+        calls.append(time.perf_counter() - start)
+        del calls[:-100]
+        print('{} took {:.4f}s'.format(fn.__name__, calls[-1]))
+        return result
+    return wrapper
+
+#-------------------------LAZY IMPORTS-----------------------
+class lazyModule:
+    '''
+        imports a module on first attribute access, so heavy modules do not
+        slow down tool startup.
+    '''
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attr):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attr)
+
+np = lazyModule('numpy')
+om = lazyModule('maya.api.OpenMaya')
+oma = lazyModule('maya.api.OpenMayaAnim')
+positionAlongCurve = lazyModule('maya.app.general.positionAlongCurve')
+sparse = lazyModule('scipy.sparse')
+sparseLinalg = lazyModule('scipy.sparse.linalg')
+#scipy is optional, accessing it raises ImportError when it is not installed.
+
+#-------------------------UI STATE-----------------------
+def saveState(key, value):
+    '''
+        persists a ui value between sessions as a maya optionVar.
+    '''
+    key = 'autoHandRig_' + key
+    if isinstance(value, (bool, int)):
+        cmds.optionVar(intValue=(key, int(value)))
+    elif isinstance(value, float):
+        cmds.optionVar(floatValue=(key, value))
+    else:
+        cmds.optionVar(stringValue=(key, value))
+
+def loadState(key, default):
+    '''
+        returns a persisted ui value, or the default if none was saved.
+    '''
+    key = 'autoHandRig_' + key
+    if cmds.optionVar(exists=key):
+        return type(default)(cmds.optionVar(q=key))
+    return default
+
 def isObjectSelected():
     '''
         detects whether any object exists in scene and is currenly selected.
@@ -66,6 +137,15 @@ def isObjectSelected():
             return False
     else:
         return False
+
+def isHandControl(node):
+    '''
+        returns whether a curve transform or shape is one of the finger
+        controls rather than a drawn stroke.
+    '''
+    if cmds.objectType(node, isAType='shape'):
+        node = cmds.listRelatives(node, parent=True, fullPath=True)[0]
+    return cmds.attributeQuery('handControl', node=node, exists=True)
         
 class curveCVcontrols:
     
@@ -82,7 +162,7 @@ class curveCVcontrols:
                 objectTransform = cmds.listRelatives(i, children=True)
                 objectType = cmds.ls(objectTransform, showType=True)
                 if len(objectType)>1:
-                    if objectType[1] == 'nurbsCurve':
+                    if objectType[1] == 'nurbsCurve' and not isHandControl(i):
                         self.isCurve = True
             except ValueError:
                 pass
@@ -101,7 +181,7 @@ class curveCVcontrols:
         type = cmds.ls(showType=True)
         spheres, curves = [], []
         for i in range(len(type)):
-            if type[i]=='nurbsCurve':
+            if type[i]=='nurbsCurve' and not isHandControl(type[i-1]):
                 curveShape = type[i-1]
                 curveTransform = cmds.pickWalk(curveShape, direction='up')
                 curves.append(curveTransform)
@@ -124,7 +204,7 @@ class curveCVcontrols:
             for j in range(iterator, sphereCount):
                 cmds.select(spheres[j], add=True)
 
-            pos.positionAlongCurve()
+            positionAlongCurve.positionAlongCurve()
 
             for k in cmds.ls(sl=True):
                 cmds.select(k, d=True)
@@ -160,7 +240,7 @@ class curveCVcontrols:
                 objectTransform = cmds.listRelatives(i, children=True)
                 objectType = cmds.ls(objectTransform, showType=True)
                 if len(objectType)>1:
-                    if objectType[1] == 'nurbsCurve':
+                    if objectType[1] == 'nurbsCurve' and not isHandControl(i):
                         cmds.delete(i)
                 else:
                     pass  
@@ -169,10 +249,13 @@ class curveCVcontrols:
         
 class paintHandControls:
     
-    def getAverageComponentPos(self, objects):
+    def getAverageComponentPos(self, objects, refine=True):
         '''
-                gets the average position of selected components.
+                gets the average position of selected components. When refine
+                is set, stray painted vertices are trimmed before averaging.
         ''' 
+        if refine:
+            return self.getRefinedComponentPos(objects)
         objectsConverted = [cmds.polyListComponentConversion(i, tv=True) for i in objects]
         newList = []
         for i in objectsConverted:
@@ -184,6 +267,42 @@ class paintHandControls:
         xFinal, yFinal, zFinal = sum(xPos)/len(findPositions), sum(yPos)/len(findPositions), sum(zPos)/len(findPositions)
         return xFinal, yFinal, zFinal 
     
+    def getRefinedComponentPos(self, objects):
+        '''
+            averages the painted vertices left after landmark refinement on
+            the cached mesh adjacency.
+        '''
+        vertices = cmds.ls(cmds.polyListComponentConversion(objects, tv=True) or [], fl=True)
+        if not vertices:
+            print('No mesh vertices painted. Please paint mesh components.')
+            return False
+        positions = np.array(cmds.xform(vertices, q=True, ws=True, t=True)).reshape(-1, 3)
+        meshes = np.array([i.split('.')[0] for i in vertices])
+        indices = np.array([int(re.search(r'\[(\d+)\]', i).group(1)) for i in vertices])
+        #only the painted vertices are read from the mesh.
+
+        kept = []
+        for mesh in np.unique(meshes):
+            painted = meshes == mesh
+            kept.append(meshAdjacency.fromMesh(mesh).refineLandmark(indices[painted], positions[painted])[1])
+        return tuple(np.concatenate(kept).mean(axis=0).tolist())
+
+    def importSkeleton(self, path):
+        '''
+            creates the joints of a skeleton exported by scanHandRigger.
+        '''
+        with open(path) as skeletonFile:
+            skeleton = json.load(skeletonFile)
+        cmds.select(clear=True)
+        self.createJoints(carpalNum=skeleton['carpalNum'], baseJoint=skeleton['baseJoint'],
+                            fingerTipPositions=skeleton['fingerTipPositions'],
+                            knucklePositions=skeleton['knucklePositions'])
+        for i, chain in enumerate(skeleton.get('chains', [])):
+            cmds.select(clear=True)
+            for j, position in enumerate(chain):
+                cmds.joint(n='joint_' + str(i*len(chain) + j), p=position)
+        cmds.select(clear=True)
+
     def createJoints(self, **kwargs):
         '''
             interpolate carpal joint positions based off knuckle and finger tip positions.
@@ -195,7 +314,8 @@ class paintHandControls:
 
             squaredSum = [(kwargs['fingerTipPositions']['joint_' + str(numFingers)][i] - 
                             kwargs['knucklePositions']['knuckle_' + str(numFingers)][i])**2 for i in range(3) ]
-            magnitude = m.sqrt(squaredSum[0] + squaredSum[1] + squaredSum[2])
+            magnitude = m.sqrt(squaredSum[0] + squaredSum[1] + squaredSum[2]) or 1.0
+            #coincident knuckle and finger tip positions are left for rigValidator to report.
             normalized = [(kwargs['fingerTipPositions']['joint_' + str(numFingers)][i] - 
                             kwargs['knucklePositions']['knuckle_' + str(numFingers)][i])/magnitude 
                                     for i in range(3)]   
@@ -246,6 +366,1119 @@ class paintHandControls:
             except ValueError:
                 pass
 
+class fingerControls:
+
+    maxCurl = 240.0
+    maxSpread = 15.0
+    #finger rotation in degrees applied at an attribute value of 10.
+    curlAxis, spreadAxis = 'rotateZ', 'rotateY'
+
+    def fingerChain(self, finger):
+        '''
+            returns the knuckle and carpal joints of a finger ordered from the
+            knuckle towards the finger tip.
+        '''
+        carpals = cmds.ls('finger_{}_carpal_*'.format(finger), type='joint') or []
+        carpals.sort(key=lambda i: int(i.rsplit('_', 1)[1]))
+        return ['knuckle_' + str(finger)] + carpals
+
+    def curlWeights(self, count, weights=None):
+        '''
+            normalizes the share of the curl each joint in a chain receives.
+        '''
+        weights = weights or [1.0]*count
+        total = float(sum(weights))
+        return [i/total for i in weights]
+
+    def createControl(self, name, joint, radius):
+        '''
+            creates a nurbs circle control snapped to a joint.
+        '''
+        control = cmds.circle(n=name, normal=(1,0,0), radius=radius, constructionHistory=False)[0]
+        cmds.addAttr(control, ln='handControl', at='bool', dv=True)
+        #tags the control so the curve tools do not treat it as a drawn stroke.
+        cmds.xform(control, ws=True, t=cmds.xform(joint, q=True, ws=True, t=True))
+        for attr in ['sx', 'sy', 'sz', 'v']:
+            cmds.setAttr('{}.{}'.format(control, attr), lock=True, keyable=False)
+        return control
+
+    def deleteControls(self):
+        '''
+            deletes the controls and utility nodes of a previous build.
+        '''
+        existing = cmds.ls('hand_CTRL*', 'finger_*_CTRL*', type='transform') + \
+                    cmds.ls('finger_*_curl_PMA*', type='plusMinusAverage') + \
+                    cmds.ls('*_curl_MDL*', 'finger_*_spread_MDL*', type='multDoubleLinear')
+        if existing:
+            cmds.delete(existing)
+
+    def createControls(self, weights=None, **kwargs):
+        '''
+            creates per finger curl and spread controls, and a hand fist
+            control, wired only through utility nodes and direct connections.
+            Any controls from a previous build are replaced.
+        '''
+        if not cmds.objExists('base_Joint'):
+            print('No hand joints exist in scene. Please create the hand rig to continue.')
+            return
+
+        chains = [self.fingerChain(i) for i in range(5)]
+        if weights is not None and any(len(weights) != len(i) for i in chains):
+            print('Curl weights need one value per knuckle and carpal joint ({}).'.format(len(chains[0])))
+            return
+
+        self.deleteControls()
+        handControl = self.createControl('hand_CTRL', 'base_Joint', 1.0)
+        cmds.addAttr(handControl, ln='fist', at='double', min=0, max=10, dv=0, k=True)
+
+        for finger, chain in enumerate(chains):
+            fingerControl = self.createControl('finger_{}_CTRL'.format(finger), chain[0], 0.5)
+            cmds.addAttr(fingerControl, ln='curl', at='double', min=-10, max=10, dv=0, k=True)
+            cmds.addAttr(fingerControl, ln='spread', at='double', min=-10, max=10, dv=0, k=True)
+            cmds.parent(fingerControl, handControl)
+
+            curlSum = cmds.createNode('plusMinusAverage', n='finger_{}_curl_PMA'.format(finger))
+            cmds.connectAttr(fingerControl + '.curl', curlSum + '.input1D[0]', force=True)
+            cmds.connectAttr(handControl + '.fist', curlSum + '.input1D[1]', force=True)
+            #curl and fist are summed before being shared along the chain.
+
+            for joint, weight in zip(chain, self.curlWeights(len(chain), weights)):
+                curlShare = cmds.createNode('multDoubleLinear', n=joint + '_curl_MDL')
+                cmds.setAttr(curlShare + '.input2', weight*self.maxCurl/10.0)
+                cmds.connectAttr(curlSum + '.output1D', curlShare + '.input1', force=True)
+                cmds.connectAttr(curlShare + '.output', '{}.{}'.format(joint, self.curlAxis), force=True)
+
+            spreadShare = cmds.createNode('multDoubleLinear', n='finger_{}_spread_MDL'.format(finger))
+            cmds.setAttr(spreadShare + '.input2', (finger - 2)*self.maxSpread/20.0)
+            cmds.connectAttr(fingerControl + '.spread', spreadShare + '.input1', force=True)
+            cmds.connectAttr(spreadShare + '.output', '{}.{}'.format(chain[0], self.spreadAxis), force=True)
+            #fans the fingers outwards from the middle finger.
+
+        return handControl
+
+    def expectedGraph(self):
+        '''
+            returns the node counts and connections the controls should have
+            for the joints currently in scene.
+        '''
+        connections = []
+        chains = [self.fingerChain(i) for i in range(5)]
+        for finger, chain in enumerate(chains):
+            fingerControl, curlSum = 'finger_{}_CTRL'.format(finger), 'finger_{}_curl_PMA'.format(finger)
+            spreadShare = 'finger_{}_spread_MDL'.format(finger)
+            connections += [(fingerControl + '.curl', curlSum + '.input1D[0]'),
+                            ('hand_CTRL.fist', curlSum + '.input1D[1]'),
+                            (fingerControl + '.spread', spreadShare + '.input1'),
+                            (spreadShare + '.output', '{}.{}'.format(chain[0], self.spreadAxis))]
+            for joint in chain:
+                connections += [(curlSum + '.output1D', joint + '_curl_MDL.input1'),
+                                (joint + '_curl_MDL.output', '{}.{}'.format(joint, self.curlAxis))]
+        return {'plusMinusAverage': 5, 'multDoubleLinear': sum(len(i) for i in chains) + 5,
+                'connections': connections}
+
+    def validateGraph(self):
+        '''
+            checks the finger control node graph in the scene for node counts,
+            missing connections and evaluation-serializing nodes.
+        '''
+        problems = []
+        expected = self.expectedGraph()
+        found = {'plusMinusAverage': cmds.ls('finger_*_curl_PMA*', type='plusMinusAverage'),
+                    'multDoubleLinear': cmds.ls('*_curl_MDL*', 'finger_*_spread_MDL*', type='multDoubleLinear')}
+        for nodeType, nodes in found.items():
+            if len(nodes) != expected[nodeType]:
+                problems.append('{} {} nodes, expected {}'.format(len(nodes), nodeType, expected[nodeType]))
+        for source, destination in expected['connections']:
+            if not (cmds.objExists(source) and cmds.objExists(destination) and
+                        cmds.isConnected(source, destination)):
+                problems.append('{} is not connected to {}'.format(source, destination))
+        for node in cmds.ls(type=['expression', 'script']) or []:
+            if cmds.listConnections(node, destination=True, type='joint', skipConversionNodes=True):
+                problems.append('{} drives hand joints'.format(node))
+        return problems
+
+#-------------------------SKIN WEIGHTS-----------------------
+def getSkinCluster(mesh):
+    '''
+        returns the skinCluster deforming a mesh, if any.
+    '''
+    skins = cmds.ls(cmds.listHistory(mesh) or [], type='skinCluster')
+    return skins[0] if skins else None
+
+def skinClusterFn(skin):
+    '''
+        returns the api function set of a skinCluster, the path of its mesh
+        and a component covering every vertex of that mesh.
+    '''
+    skinFn = oma.MFnSkinCluster(om.MGlobal.getSelectionListByName(skin).getDependNode(0))
+    dagPath = skinFn.getPathAtIndex(0)
+    componentFn = om.MFnSingleIndexedComponent()
+    components = componentFn.create(om.MFn.kMeshVertComponent)
+    componentFn.setCompleteData(om.MFnMesh(dagPath).numVertices)
+    return skinFn, dagPath, components
+
+def getInfluences(skin):
+    '''
+        returns the long names of the influence joints of a skinCluster in
+        the column order used by getSkinWeights.
+    '''
+    return [i.fullPathName() for i in skinClusterFn(skin)[0].influenceObjects()]
+
+def getSkinWeights(skin):
+    '''
+        reads every skin weight in one api call and returns the non-zero
+        weights as sparse coordinate arrays of vertex rows, influence
+        columns and weight values.
+    '''
+    skinFn, dagPath, components = skinClusterFn(skin)
+    weights, influenceCount = skinFn.getWeights(dagPath, components)
+    weights = np.array(weights).reshape(-1, influenceCount)
+    rows, cols = np.nonzero(weights)
+    return rows, cols, weights[rows, cols]
+
+def setSkinWeights(skin, rows, cols, values):
+    '''
+        replaces every skin weight with the given sparse coordinate arrays
+        in one api call.
+    '''
+    skinFn, dagPath, components = skinClusterFn(skin)
+    influences = skinFn.influenceObjects()
+    weights = np.zeros((om.MFnMesh(dagPath).numVertices, len(influences)))
+    weights[rows, cols] = values
+    indices = om.MIntArray([skinFn.indexForInfluenceObject(i) for i in influences])
+    skinFn.setWeights(dagPath, components, indices, om.MDoubleArray(weights.ravel().tolist()), normalize=False)
+
+def mergeSparseWeights(rows, cols, values, columnMap):
+    '''
+        remaps influence columns through columnMap and sums the weights
+        that land on the same vertex and influence.
+    '''
+    newCols = columnMap[cols]
+    width = int(columnMap.max()) + 1
+    keys, inverse = np.unique(rows*width + newCols, return_inverse=True)
+    return keys//width, keys % width, np.bincount(inverse, weights=values)
+
+class lodSkeletons:
+
+    lodLevels = [3, 2, 1]
+    #joints retained per finger at each lower level of detail.
+
+    def __init__(self):
+        self.lods = {}
+
+    def denseChain(self, finger):
+        '''
+            returns the full finger chain from knuckle to finger tip.
+        '''
+        carpals = cmds.ls('finger_{}_carpal_*'.format(finger), type='joint') or []
+        carpals.sort(key=lambda i: int(i.rsplit('_', 1)[1]))
+        return ['knuckle_' + str(finger)] + carpals + ['finger_' + str(finger)]
+
+    def retainedJoints(self, chain, count):
+        '''
+            picks an evenly spaced subset of a chain, always keeping the knuckle.
+        '''
+        if count >= len(chain):
+            return list(chain)
+        if count == 1:
+            return chain[:1]
+        step = (len(chain) - 1)/float(count - 1)
+        return [chain[int(round(i*step))] for i in range(count)]
+
+    def buildLods(self, mesh=None, **kwargs):
+        '''
+            builds nested skeletons from the dense hand joints. Each level
+            keeps a subset of the joints of the level above it and, if the
+            mesh is skinned, receives merged skin weights on a duplicate mesh.
+        '''
+        if not cmds.objExists('base_Joint'):
+            print('No hand joints exist in scene. Please create the hand rig to continue.')
+            return
+
+        levels = kwargs.get('levels', self.lodLevels)
+        chains = [self.denseChain(i) for i in range(5)]
+        self.deleteLods()
+        self.lods = {}
+        for level, count in enumerate(levels, 1):
+            chains = [self.retainedJoints(i, count) for i in chains]
+            #subsets of the previous level keep the skeletons nested.
+            lodJoints = self.createSkeleton('LOD{}_'.format(level), chains)
+            self.lods[level] = lodJoints['base_Joint']
+            if mesh is not None and getSkinCluster(mesh):
+                self.transferWeights(mesh, 'LOD{}_'.format(level), chains, lodJoints)
+        return self.lods
+
+    def deleteLods(self):
+        '''
+            deletes the skeletons and meshes of a previous LOD build.
+        '''
+        meshes = cmds.listRelatives(cmds.ls(type='mesh'), parent=True, fullPath=True) or []
+        existing = cmds.ls('LOD*_base_Joint*', type='joint', long=True) + \
+                    [i for i in set(meshes) if re.match(r'LOD\d+_', i.split('|')[-1])]
+        if existing:
+            cmds.delete(existing)
+
+    def createSkeleton(self, prefix, chains):
+        '''
+            creates a copy of the retained joints at their world positions,
+            returning the long names of the new joints keyed by dense joint.
+        '''
+        cmds.select(clear=True)
+        root = cmds.joint(n=prefix + 'base_Joint', p=cmds.xform('base_Joint', q=True, ws=True, t=True))
+        lodJoints = {'base_Joint': cmds.ls(root, long=True)[0]}
+        for chain in chains:
+            cmds.select(root, replace=True)
+            for joint in chain:
+                created = cmds.joint(n=prefix + joint, p=cmds.xform(joint, q=True, ws=True, t=True))
+                lodJoints[joint] = cmds.ls(created, long=True)[0]
+        cmds.select(clear=True)
+        return lodJoints
+
+    def transferWeights(self, mesh, prefix, chains, lodJoints):
+        '''
+            binds a duplicate mesh to a level of detail skeleton, merging the
+            weights of removed joints into their retained parents.
+        '''
+        denseSkin = getSkinCluster(mesh)
+        denseInfluences = getInfluences(denseSkin)
+        retained = set(j for i in chains for j in i) | set(['base_Joint'])
+
+        target = {}
+        for finger in range(5):
+            parent = None
+            for joint in self.denseChain(finger):
+                parent = joint if joint in retained else parent
+                target[joint] = parent
+        #removed joints are merged into the closest retained joint above them.
+
+        lodMesh = cmds.duplicate(mesh, n=prefix + mesh.split('|')[-1])[0]
+        lodSkin = cmds.skinCluster(list(lodJoints.values()), lodMesh, toSelectedBones=True)[0]
+        lodIndex = dict((joint, index) for index, joint in enumerate(getInfluences(lodSkin)))
+
+        columnMap = np.array([lodIndex[lodJoints[target.get(i.split('|')[-1]) or 'base_Joint']]
+                                for i in denseInfluences], dtype=np.int64)
+        rows, cols, values = mergeSparseWeights(*getSkinWeights(denseSkin), columnMap=columnMap)
+        setSkinWeights(lodSkin, rows, cols, values)
+        return lodSkin
+
+    def exportLod(self, level, path):
+        '''
+            exports a level of detail skeleton and its bound mesh. Level 0
+            exports the dense skeleton.
+        '''
+        prefix = 'LOD{}_'.format(level) if level else ''
+        meshes = set(cmds.listRelatives(cmds.ls(type='mesh', noIntermediate=True), parent=True) or [])
+        meshes = [i for i in meshes if (i.startswith(prefix) if level else not re.match(r'LOD\d+_', i))]
+        selection = cmds.ls(prefix + 'base_Joint') + meshes
+        if not cmds.objExists(prefix + 'base_Joint'):
+            print('LOD {} does not exist. Please build the LODs to continue.'.format(level))
+            return
+        fileType = 'mayaAscii' if path.endswith('.ma') else 'mayaBinary'
+        if path.endswith('.fbx'):
+            cmds.loadPlugin('fbxmaya', quiet=True)
+            fileType = 'FBX export'
+        cmds.select(selection, replace=True)
+        cmds.file(path, force=True, exportSelected=True, type=fileType)
+
+#-------------------------MESH SMOOTHING-----------------------
+def meshEdges(counts, indices):
+    '''
+        returns the unique undirected edges of polygons given as per face
+        vertex counts and a flat array of face vertex indices.
+    '''
+    counts, indices = np.asarray(counts, dtype=np.int64), np.asarray(indices, dtype=np.int64)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    following = np.arange(len(indices)) + 1
+    wrap = following == starts + np.repeat(counts, counts)
+    following[wrap] = starts[wrap]
+    #the last vertex of each face connects back to its first vertex.
+    edges = np.sort(np.stack([indices, indices[following]], axis=1), axis=1)
+    return np.unique(edges, axis=0)
+
+def meshFaces(mesh):
+    '''
+        reads the face vertex counts, face vertex indices and vertex count
+        of a mesh through the maya api.
+    '''
+    meshFn = om.MFnMesh(om.MGlobal.getSelectionListByName(mesh).getDagPath(0))
+    counts, indices = meshFn.getVertices()
+    return np.array(counts), np.array(indices), meshFn.numVertices
+
+class meshAdjacency:
+
+    cache = {}
+    #adjacency keyed by mesh topology, built once per topology.
+
+    def __init__(self, edges, vertexCount):
+        self.vertexCount = vertexCount
+        self.rows = np.concatenate([edges[:, 0], edges[:, 1]])
+        self.cols = np.concatenate([edges[:, 1], edges[:, 0]])
+        self.degree = np.bincount(self.rows, minlength=vertexCount).astype(float)
+        self.laplacian = None
+        self.factorizations = {}
+        #sparse laplacian and its factorizations keyed by strength, assembled once.
+
+    @staticmethod
+    def fromMesh(mesh):
+        '''
+            returns the cached adjacency of a maya mesh, building it when
+            the topology has not been seen before.
+        '''
+        key = (mesh, cmds.polyEvaluate(mesh, vertex=True), cmds.polyEvaluate(mesh, edge=True),
+                cmds.polyEvaluate(mesh, face=True))
+        if key not in meshAdjacency.cache:
+            counts, indices, vertexCount = meshFaces(mesh)
+            meshAdjacency.cache[key] = meshAdjacency(meshEdges(counts, indices), vertexCount)
+        return meshAdjacency.cache[key]
+
+    def neighbourSum(self, values):
+        '''
+            sums the values of each vertex neighbour, for one or many columns.
+        '''
+        summed = np.zeros((self.vertexCount,) + values.shape[1:])
+        np.add.at(summed, self.rows, values[self.cols])
+        return summed
+
+    def smooth(self, values, iterations=10, alpha=0.5):
+        '''
+            iterative uniform laplacian smoothing of per vertex values.
+        '''
+        degree = self.degree.reshape((-1,) + (1,)*(values.ndim - 1))
+        isolated = degree == 0
+        for i in range(iterations):
+            average = self.neighbourSum(values)/(degree + isolated)
+            values = values + alpha*(average - values)*(~isolated)
+        return values
+
+    def solve(self, values, strength=1.0, iterations=50):
+        '''
+            direct solve of (I + strength*L)x = values with the uniform graph
+            laplacian L. Uses scipy when available, otherwise jacobi iterations.
+        '''
+        try:
+            factorization = self.factorize(strength)
+        except ImportError:
+            degree = self.degree.reshape((-1,) + (1,)*(values.ndim - 1))
+            result = values
+            for i in range(iterations):
+                result = (values + strength*self.neighbourSum(result))/(1.0 + strength*degree)
+            return result
+        return factorization.solve(np.asarray(values, dtype=float))
+
+    def factorize(self, strength):
+        '''
+            returns the cached sparse lu factorization of (I + strength*L),
+            assembling the laplacian on first use.
+        '''
+        if strength not in self.factorizations:
+            if self.laplacian is None:
+                adjacency = sparse.csc_matrix((np.ones(len(self.rows)), (self.rows, self.cols)),
+                                                shape=(self.vertexCount, self.vertexCount))
+                self.laplacian = sparse.diags(self.degree, format='csc') - adjacency
+            system = sparse.identity(self.vertexCount, format='csc') + strength*self.laplacian
+            self.factorizations[strength] = sparseLinalg.splu(sparse.csc_matrix(system))
+        return self.factorizations[strength]
+
+    def components(self, vertices):
+        '''
+            labels the connected patches of a subset of vertices.
+        '''
+        inside = np.zeros(self.vertexCount, dtype=bool)
+        inside[vertices] = True
+        mask = inside[self.rows] & inside[self.cols]
+        rows, cols = self.rows[mask], self.cols[mask]
+        labels = np.arange(self.vertexCount)
+        while True:
+            updated = labels.copy()
+            np.minimum.at(updated, rows, labels[cols])
+            if np.array_equal(updated, labels):
+                return labels[vertices]
+            labels = updated
+
+    def refineLandmark(self, vertices, positions, trim=3.0):
+        '''
+            trims painted vertices outside the main connected patch and
+            those far from its median position. Takes the positions of the
+            painted vertices only and returns the kept vertices and positions.
+        '''
+        vertices, first = np.unique(np.asarray(vertices, dtype=np.int64), return_index=True)
+        positions = np.asarray(positions, dtype=float)[first]
+        if len(vertices) < 3:
+            return vertices, positions
+        labels = self.components(vertices)
+        values, counts = np.unique(labels, return_counts=True)
+        largest = labels == values[np.argmax(counts)]
+        vertices, positions = vertices[largest], positions[largest]
+        #keeps the largest patch, dropping stray faces on other fingers.
+
+        distance = np.linalg.norm(positions - np.median(positions, axis=0), axis=1)
+        deviation = np.median(np.abs(distance - np.median(distance))) or distance.max() or 1.0
+        kept = distance <= np.median(distance) + trim*deviation
+        return vertices[kept], positions[kept]
+
+def smoothSkinWeights(mesh, iterations=10, alpha=0.5, direct=False, strength=1.0):
+    '''
+        smooths the skin weights of a mesh over all influences at once and
+        renormalizes them.
+    '''
+    skin = getSkinCluster(mesh)
+    if skin is None:
+        print('{} is not skinned. Please bind the mesh to continue.'.format(mesh))
+        return
+    adjacency = meshAdjacency.fromMesh(mesh)
+    rows, cols, values = getSkinWeights(skin)
+    weights = np.zeros((adjacency.vertexCount, len(getInfluences(skin))))
+    weights[rows, cols] = values
+
+    if direct:
+        weights = adjacency.solve(weights, strength)
+    else:
+        weights = adjacency.smooth(weights, iterations, alpha)
+    weights[weights < 1e-4] = 0.0
+    weights /= np.maximum(weights.sum(axis=1, keepdims=True), 1e-12)
+
+    rows, cols = np.nonzero(weights)
+    setSkinWeights(skin, rows, cols, weights[rows, cols])
+
+#-------------------------RIG VALIDATION-----------------------
+class rigValidator:
+
+    tolerance = 1e-3
+    #fraction of the median bone length below which a bone is zero length.
+
+    def __init__(self, root='base_Joint'):
+        self.root = root
+        self.joints = []
+        self.chains = []
+
+    def findRoots(self):
+        '''
+            returns the painted rig root, or the root joint of every curve
+            built chain when no painted rig exists.
+        '''
+        if cmds.objExists(self.root):
+            return cmds.ls(self.root, long=True)[:1]
+        return [i for i in cmds.ls(type='joint', long=True) or []
+                    if not cmds.listRelatives(i, parent=True, type='joint')]
+
+    def collectSkeleton(self, roots):
+        '''
+            reads the joint names, world positions and parent indices of the
+            skeletons below the root joints, and their finger chains.
+        '''
+        self.paths = []
+        for root in roots:
+            self.paths += [root] + (cmds.listRelatives(root, allDescendents=True, type='joint', fullPath=True) or [])[::-1]
+        self.joints = [i.split('|')[-1] for i in self.paths]
+        index = dict((path, i) for i, path in enumerate(self.paths))
+        self.positions = np.array([cmds.xform(i, q=True, ws=True, t=True) for i in self.paths])
+        self.parents = np.array([index.get(i.rsplit('|', 1)[0], -1) for i in self.paths])
+        #full paths keep duplicated joint names queryable.
+
+        self.painted = self.root in self.joints
+        if self.painted:
+            names = dict((joint, i) for i, joint in enumerate(self.joints))
+            self.chains = [[names[j] for j in lodSkeletons().denseChain(i) if j in names] for i in range(5)]
+        else:
+            self.chains = [[index[root]] + [index[j] for j in sorted(self.paths, key=lambda j: j.count('|'))
+                                                if j.startswith(root + '|')] for root in roots]
+            #curve built chains run from their root joint down the hierarchy.
+        self.chains = [i for i in self.chains if i]
+
+    def checkBones(self):
+        '''
+            returns joints whose bone to their parent has zero length.
+        '''
+        child = np.nonzero(self.parents >= 0)[0]
+        lengths = np.linalg.norm(self.positions[child] - self.positions[self.parents[child]], axis=1)
+        limit = self.tolerance*(np.median(lengths) if len(lengths) else 0.0)
+        return [self.joints[i] for i in child[lengths <= limit]]
+
+    def checkMissingFingers(self):
+        '''
+            returns the knuckle and finger tip joints missing from a painted
+            rig, or a note when a curve built rig has fewer than five chains.
+        '''
+        if not self.painted:
+            return ['{} of 5 finger chains'.format(len(self.chains))] if len(self.chains) < 5 else []
+        expected = ['knuckle_' + str(i) for i in range(5)] + ['finger_' + str(i) for i in range(5)]
+        return [i for i in expected if i not in self.joints]
+
+    def checkMonotonicChains(self):
+        '''
+            returns joints that do not move further along their finger than
+            the joint before them.
+        '''
+        if not self.chains:
+            return []
+        chains = np.concatenate([np.array(i, dtype=np.int64) for i in self.chains])
+        fingers = np.repeat(np.arange(len(self.chains)), [len(i) for i in self.chains])
+        last = np.cumsum([len(i) for i in self.chains]) - 1
+        first = last - [len(i) - 1 for i in self.chains]
+        direction = self.positions[chains[last[fingers]]] - self.positions[chains[first[fingers]]]
+        direction /= np.maximum(np.linalg.norm(direction, axis=1, keepdims=True), 1e-12)
+        progress = np.einsum('ij,ij->i', self.positions[chains], direction)
+        #distance of every chain joint along its first to last joint direction.
+        sameFinger = fingers[1:] == fingers[:-1]
+        return [self.joints[i] for i in chains[1:][sameFinger & (np.diff(progress) <= 0)]]
+
+    def checkCollinearPalm(self):
+        '''
+            returns the palm joints of a painted rig if the base and knuckles
+            lie along a line.
+        '''
+        palm = [self.joints.index(i) for i in [self.root] + ['knuckle_' + str(i) for i in range(5)]
+                    if i in self.joints]
+        if not self.painted or len(palm) < 3:
+            return []
+        centered = self.positions[palm] - self.positions[palm].mean(axis=0)
+        singular = np.linalg.svd(centered, compute_uv=False)
+        if singular[0] == 0 or singular[1]/singular[0] < self.tolerance*10:
+            return [self.joints[i] for i in palm]
+        return []
+
+    def checkHierarchy(self):
+        '''
+            returns joints with duplicate names, finger tips not parented
+            below their knuckle, or joints where a curve built chain branches.
+        '''
+        problems = [i for i in set(self.joints) if len(cmds.ls(i)) > 1]
+        if not self.painted:
+            children = np.bincount(self.parents[self.parents >= 0], minlength=len(self.joints))
+            return problems + [self.joints[i] for i in np.nonzero(children > 1)[0]]
+        paths = dict(zip(self.joints, self.paths))
+        for finger in range(5):
+            knuckle, tip = 'knuckle_' + str(finger), 'finger_' + str(finger)
+            if knuckle in paths and tip in paths and not paths[tip].startswith(paths[knuckle] + '|'):
+                problems.append(tip)
+        return problems
+
+    def checkInsideMesh(self, mesh):
+        '''
+            returns joints outside the mesh. The mesh intersector is built
+            for each call so edits and moves made since the last
+            validation are always seen.
+        '''
+        dagPath = om.MGlobal.getSelectionListByName(mesh).getDagPath(0)
+        matrix = dagPath.inclusiveMatrix()
+        intersector = om.MMeshIntersector()
+        intersector.create(om.MDagPath(dagPath).extendToShape().node(), matrix)
+
+        normalMatrix = matrix.inverse().transpose()
+        closest = [intersector.getClosestPoint(om.MPoint(*i)) for i in self.positions.tolist()]
+        points = [om.MPoint(i.point.x, i.point.y, i.point.z)*matrix for i in closest]
+        normals = [om.MVector(i.normal.x, i.normal.y, i.normal.z)*normalMatrix for i in closest]
+        #closest points and normals are returned in object space.
+        points = np.array([(i.x, i.y, i.z) for i in points])
+        normals = np.array([(i.x, i.y, i.z) for i in normals])
+        outside = np.einsum('ij,ij->i', self.positions - points, normals) > 0
+        return [self.joints[i] for i in np.nonzero(outside)[0]]
+
+    def validate(self, mesh=None):
+        '''
+            runs every check on the painted rig, or on every curve built
+            chain, and returns a report.
+        '''
+        start = time.perf_counter()
+        roots = self.findRoots()
+        if not roots:
+            return {'valid': False, 'joints': 0, 'errors': {'missingRoot': [self.root]},
+                    'seconds': time.perf_counter() - start}
+
+        self.collectSkeleton(roots)
+        errors = {'zeroLengthBones': self.checkBones(),
+                    'missingFingers': self.checkMissingFingers(),
+                    'nonMonotonicChains': self.checkMonotonicChains(),
+                    'collinearPalm': self.checkCollinearPalm(),
+                    'hierarchy': self.checkHierarchy()}
+        if mesh is not None:
+            errors['outsideMesh'] = self.checkInsideMesh(mesh)
+        errors = dict((check, joints) for check, joints in errors.items() if joints)
+        return {'valid': not errors, 'joints': len(self.joints), 'errors': errors,
+                'seconds': time.perf_counter() - start}
+
+    def validateAssets(self, paths, reportPath=None):
+        '''
+            opens each maya file, validates its hand rig against its first
+            mesh and writes one json report line per asset. Any unsaved
+            changes to the current scene are discarded.
+        '''
+        reports = []
+        for path in paths:
+            start = time.perf_counter()
+            try:
+                cmds.file(path, open=True, force=True)
+                shapes = cmds.ls(type='mesh', noIntermediate=True)
+                meshes = cmds.listRelatives(shapes, parent=True) if shapes else None
+                report = self.validate(meshes[0] if meshes else None)
+            except RuntimeError as error:
+                report = {'valid': False, 'joints': 0, 'errors': {'file': [str(error)]}}
+            report['asset'] = path
+            report['seconds'] = time.perf_counter() - start
+            reports.append(report)
+            print('{}: {} ({:.3f}s)'.format(path, 'valid' if report['valid'] else 'invalid', report['seconds']))
+
+        if reportPath is not None:
+            with open(reportPath, 'w') as reportFile:
+                for report in reports:
+                    reportFile.write(json.dumps(report, separators=(',', ':')) + '\n')
+        return reports
+
+#-------------------------SCAN MESH READING-----------------------
+def fanTriangles(counts, indices):
+    '''
+        triangulates polygons given as per face vertex counts and a flat
+        array of face vertex indices, returning an (n, 3) array.
+    '''
+    counts, indices = np.asarray(counts, dtype=np.int64), np.asarray(indices, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    triangleCounts = np.maximum(counts - 2, 0)
+    face = np.repeat(np.arange(len(counts)), triangleCounts)
+    corner = np.arange(len(face)) - np.repeat(np.cumsum(triangleCounts) - triangleCounts, triangleCounts) + 1
+    return np.stack([indices[starts[face]], indices[starts[face] + corner],
+                        indices[starts[face] + corner + 1]], axis=1)
+
+class memmapWriter:
+
+    def __init__(self, path, dtype, width):
+        self.path, self.dtype, self.width = path, np.dtype(dtype), width
+        self.temporaryPath = path + '.partial'
+        self.file = open(self.temporaryPath, 'wb')
+
+    def append(self, rows):
+        self.file.write(rows.astype(self.dtype).tobytes())
+
+    def commit(self):
+        '''
+            closes the partial file and moves it over the cache file.
+        '''
+        self.file.close()
+        os.replace(self.temporaryPath, self.path)
+
+    def discard(self):
+        '''
+            closes and deletes the partial file after a failed parse.
+        '''
+        self.file.close()
+        if os.path.exists(self.temporaryPath):
+            os.remove(self.temporaryPath)
+
+def openMemmap(path, dtype, width):
+    rows = os.path.getsize(path)//(np.dtype(dtype).itemsize*width)
+    if rows == 0:
+        return np.zeros((0, width), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(rows, width))
+
+def gatherRuns(starts, counts):
+    '''
+        returns the positions start, start+1 ... start+count-1 of every run,
+        concatenated.
+    '''
+    counts = np.asarray(counts, dtype=np.int64)
+    return np.repeat(starts, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+class textBlock:
+    '''
+        tokenizes a block of complete text lines with array operations only.
+    '''
+    def __init__(self, chunk):
+        if not chunk.endswith(b'\n'):
+            chunk += b'\n'
+        raw = np.frombuffer(chunk, dtype=np.uint8)
+        newline = raw == 10
+        self.space = newline | (raw == 32) | (raw == 9) | (raw == 13)
+        self.text = np.where(self.space, np.uint8(32), raw)
+        #every kind of whitespace becomes a plain space for numpy parsing.
+        self.lineEnds = np.flatnonzero(newline)
+        self.lineStarts = np.concatenate([[0], self.lineEnds[:-1] + 1])
+        self.lineOf = np.cumsum(newline, dtype=np.int32) - newline
+        self.tokenStart = ~self.space & np.concatenate([[True], self.space[:-1]])
+        self.tokens = np.bincount(self.lineOf[self.tokenStart], minlength=len(self.lineStarts))
+
+    def lineType(self, character):
+        '''
+            returns the lines starting with a keyword of one character.
+        '''
+        second = np.minimum(self.lineStarts + 1, len(self.text) - 1)
+        return (self.text[self.lineStarts] == ord(character)) & self.space[second] & \
+                    (self.lineStarts + 1 < self.lineEnds)
+
+    def values(self, lines, dtype, first=0, last=None):
+        '''
+            parses every number on the selected lines, or on the range of
+            lines from first to last, into one flat array.
+        '''
+        if last is not None:
+            block = self.text[self.lineStarts[first]:self.lineEnds[last - 1] + 1]
+        else:
+            block = self.text[lines[self.lineOf]]
+        return np.fromstring(block.tobytes(), dtype=dtype, sep=' ')
+
+class scanMeshReader:
+
+    chunkBytes = 1 << 22
+    #bytes of text, or binary records, parsed per chunk.
+    plyTypes = {'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1', 'short': 'i2', 'int16': 'i2',
+                'ushort': 'u2', 'uint16': 'u2', 'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+                'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'}
+
+    def __init__(self, path, cacheDirectory=None):
+        self.path = path
+        stem = os.path.basename(path)
+        cacheDirectory = cacheDirectory or os.path.dirname(os.path.abspath(path))
+        self.pointsPath = os.path.join(cacheDirectory, stem + '.points.f4')
+        self.trianglesPath = os.path.join(cacheDirectory, stem + '.triangles.i4')
+
+    def read(self):
+        '''
+            returns memory mapped (n, 3) point and triangle arrays, streaming
+            the source file into the cache files if they are out of date.
+            Cache files are only written after a successful parse.
+        '''
+        cached = [os.path.exists(i) and os.path.getmtime(i) >= os.path.getmtime(self.path)
+                    for i in [self.pointsPath, self.trianglesPath]]
+        if all(cached):
+            return openMemmap(self.pointsPath, 'f4', 3), openMemmap(self.trianglesPath, 'i4', 3)
+
+        extension = os.path.splitext(self.path)[1].lower()
+        if extension not in ['.obj', '.ply']:
+            print('Unsupported mesh format. Please use an obj or ply file.')
+            return None
+
+        points, triangles = memmapWriter(self.pointsPath, 'f4', 3), memmapWriter(self.trianglesPath, 'i4', 3)
+        try:
+            with open(self.path, 'rb') as meshFile:
+                if extension == '.obj':
+                    parsed = self.readObj(meshFile, points, triangles)
+                else:
+                    parsed = self.readPly(meshFile, points, triangles)
+        except BaseException:
+            points.discard()
+            triangles.discard()
+            raise
+        if not parsed:
+            points.discard()
+            triangles.discard()
+            return None
+        points.commit()
+        triangles.commit()
+        return openMemmap(self.pointsPath, 'f4', 3), openMemmap(self.trianglesPath, 'i4', 3)
+
+    def textChunks(self, meshFile):
+        '''
+            yields blocks of complete lines from a text file.
+        '''
+        remainder = b''
+        while True:
+            chunk = meshFile.read(self.chunkBytes)
+            if not chunk:
+                if remainder:
+                    yield remainder
+                return
+            chunk = remainder + chunk
+            end = chunk.rfind(b'\n') + 1
+            remainder = chunk[end:]
+            if end:
+                yield chunk[:end]
+
+    def readObj(self, meshFile, points, triangles):
+        '''
+            streams obj vertex and face lines, parsing each chunk of lines
+            with array operations.
+        '''
+        vertexCount = 0
+        for chunk in self.textChunks(meshFile):
+            block = textBlock(chunk)
+            vertexLines, faceLines = block.lineType('v'), block.lineType('f')
+            block.text[block.lineStarts[vertexLines | faceLines]] = 32
+            #drops the v and f keywords so only numbers remain on those lines.
+
+            if vertexLines.any():
+                widths = block.tokens[vertexLines] - 1
+                values = block.values(vertexLines, np.float32)
+                if widths.min() < 3 or len(values) != widths.sum():
+                    print('Malformed obj vertex line in {}.'.format(self.path))
+                    return False
+                offsets = np.cumsum(widths) - widths
+                points.append(values[offsets[:, None] + np.arange(3)])
+                #only x, y and z are kept from lines with extra colour columns.
+
+            if faceLines.any():
+                slash = block.text == ord('/')
+                slashes = np.cumsum(slash, dtype=np.int32)
+                tokenFirst = np.maximum.accumulate(np.where(block.tokenStart, np.arange(len(slash)), 0))
+                afterSlash = (slashes - slashes[tokenFirst] + slash[tokenFirst] > 0) & ~block.space
+                block.text[afterSlash] = 32
+                #keeps the vertex index of v/vt/vn face corners.
+
+                counts = block.tokens[faceLines] - 1
+                indices = block.values(faceLines, np.int64)
+                if counts.min() < 3 or len(indices) != counts.sum():
+                    print('Malformed obj face line in {}.'.format(self.path))
+                    return False
+                verticesBefore = vertexCount + np.cumsum(vertexLines)[faceLines]
+                verticesBefore = np.repeat(verticesBefore, counts)
+                indices = np.where(indices < 0, indices + verticesBefore, indices - 1)
+                #obj indices are one based, or negative relative to the vertices
+                #defined before their own face line.
+                triangles.append(fanTriangles(counts, indices))
+            vertexCount += int(vertexLines.sum())
+        return True
+
+    def readPlyHeader(self, meshFile):
+        '''
+            returns the ply format and its elements as (name, count, properties).
+        '''
+        elements, fileFormat = [], None
+        for line in iter(meshFile.readline, b''):
+            words = line.decode('ascii').split()
+            if not words:
+                continue
+            if words[0] == 'format':
+                fileFormat = words[1]
+            elif words[0] == 'element':
+                elements.append((words[1], int(words[2]), []))
+            elif words[0] == 'property' and words[1] == 'list':
+                elements[-1][2].append((words[4], self.plyTypes[words[2]], self.plyTypes[words[3]]))
+            elif words[0] == 'property':
+                elements[-1][2].append((words[2], self.plyTypes[words[1]], None))
+            elif words[0] == 'end_header':
+                break
+        return fileFormat, elements
+
+    def readPly(self, meshFile, points, triangles):
+        '''
+            streams the vertex and face elements of an ascii or binary ply.
+        '''
+        fileFormat, elements = self.readPlyHeader(meshFile)
+        if fileFormat not in ['ascii', 'binary_little_endian', 'binary_big_endian']:
+            print('Unsupported ply format {}.'.format(fileFormat))
+            return False
+        for name, count, properties in elements:
+            if len([i for i in properties if i[2]]) > 1:
+                print('Unsupported ply {} element with several list properties.'.format(name))
+                return False
+            if name == 'vertex' and not set(['x', 'y', 'z']) <= set(i[0] for i in properties if not i[2]):
+                print('Unsupported ply vertex element without x, y and z properties.')
+                return False
+            if name == 'vertex' and any(i[2] for i in properties):
+                print('Unsupported ply vertex element with a list property.')
+                return False
+        if fileFormat == 'ascii':
+            return self.readPlyAscii(meshFile, elements, points, triangles)
+
+        order = '>' if fileFormat == 'binary_big_endian' else '<'
+        remainder = b''
+        for name, count, properties in elements:
+            if any(i[2] for i in properties):
+                remainder = self.readPlyBinaryLists(meshFile, remainder, name, count, properties, order, triangles)
+            else:
+                remainder = self.readPlyBinaryRecords(meshFile, remainder, name, count, properties, order, points)
+            if remainder is None:
+                print('Unexpected end of file in ply {} element.'.format(name))
+                return False
+        return True
+
+    def readPlyBinaryRecords(self, meshFile, remainder, name, count, properties, order, points):
+        '''
+            reads fixed size binary records in chunks, keeping vertex positions.
+            Returns the bytes read past the element.
+        '''
+        dtype = np.dtype([(i[0], order + i[1]) for i in properties])
+        chunkRecords = max(self.chunkBytes//dtype.itemsize, 1)
+        for start in range(0, count, chunkRecords):
+            size = min(chunkRecords, count - start)*dtype.itemsize
+            data = remainder[:size]
+            data += meshFile.read(size - len(data))
+            remainder = remainder[size:]
+            if len(data) < size:
+                return None
+            data = np.frombuffer(data, dtype=dtype)
+            if name == 'vertex':
+                points.append(np.stack([data['x'], data['y'], data['z']], axis=1))
+        return remainder
+
+    def recordStarts(self, data, before, countType, indexSize, after):
+        '''
+            returns the start offsets of the consecutive variable size records
+            in a byte buffer, found for all records at once by pointer
+            doubling, and whether the last one is complete.
+        '''
+        size = len(data)
+        fits = max(size - before - countType.itemsize + 1, 0)
+        raw = np.frombuffer(data, dtype=np.uint8)
+        counts = np.zeros(size + 1, dtype=np.int64)
+        if fits:
+            countBytes = raw[before + np.arange(fits)[:, None] + np.arange(countType.itemsize)]
+            counts[:fits] = np.ascontiguousarray(countBytes).view(countType).ravel()
+        ends = np.arange(size + 1) + before + countType.itemsize + counts*indexSize + after
+        following = np.where((np.arange(size + 1) < fits) & (ends <= size), ends, size)
+        following[size] = size
+        #records that do not fit in the buffer jump straight to the end.
+
+        reached = np.zeros(size + 1, dtype=bool)
+        reached[0] = True
+        while True:
+            updated = reached.copy()
+            updated[following[reached]] = True
+            if np.array_equal(updated, reached):
+                break
+            reached, following = updated, following[following]
+        #each pass doubles the number of records followed from the start.
+        starts = np.flatnonzero(reached[:size])
+        return starts, counts[starts], ends[starts]
+
+    def readPlyBinaryLists(self, meshFile, remainder, name, count, properties, order, triangles):
+        '''
+            reads binary elements with one list property in chunks, locating
+            every record in a chunk at once. Returns the bytes read past the
+            element.
+        '''
+        listIndex = [i for i, j in enumerate(properties) if j[2]][0]
+        before = sum(np.dtype(i[1]).itemsize for i in properties[:listIndex])
+        after = sum(np.dtype(i[1]).itemsize for i in properties[listIndex + 1:])
+        countType = np.dtype(order + properties[listIndex][1])
+        indexType = np.dtype(order + properties[listIndex][2])
+
+        remaining = count
+        while remaining:
+            data = remainder + meshFile.read(self.chunkBytes)
+            if not data:
+                return None
+            starts, counts, ends = self.recordStarts(data, before, countType, indexType.itemsize, after)
+            complete = ends <= len(data)
+            starts, counts, ends = starts[complete][:remaining], counts[complete][:remaining], ends[complete][:remaining]
+            if not len(starts):
+                if len(data) == len(remainder):
+                    return None
+                remainder = data
+                continue
+            #a record split across chunks is read again with the next chunk.
+
+            if name == 'face':
+                positions = gatherRuns(starts + before + countType.itemsize, counts*indexType.itemsize)
+                indices = np.ascontiguousarray(np.frombuffer(data, dtype=np.uint8)[positions]).view(indexType)
+                triangles.append(fanTriangles(counts, indices))
+            remainder = data[int(ends[-1]):]
+            remaining -= len(starts)
+        return remainder
+
+    def readPlyAscii(self, meshFile, elements, points, triangles):
+        '''
+            reads ascii ply element lines in chunks, parsing the lines of each
+            element with array operations.
+        '''
+        element, remaining = 0, elements[0][1] if elements else 0
+        for chunk in self.textChunks(meshFile):
+            block = textBlock(chunk)
+            line = 0
+            while line < len(block.lineStarts) and element < len(elements):
+                if not remaining:
+                    element += 1
+                    remaining = elements[element][1] if element < len(elements) else 0
+                    continue
+                name, count, properties = elements[element]
+                last = line + min(remaining, len(block.lineStarts) - line)
+                if name == 'vertex':
+                    names = [i[0] for i in properties]
+                    values = block.values(None, np.float32, line, last)
+                    if len(values) != (last - line)*len(names):
+                        print('Malformed ply vertex line in {}.'.format(self.path))
+                        return False
+                    values = values.reshape(last - line, len(names))
+                    points.append(values[:, [names.index('x'), names.index('y'), names.index('z')]])
+                elif name == 'face':
+                    listIndex = [i for i, j in enumerate(properties) if j[2]][0]
+                    tokens = block.tokens[line:last]
+                    values = block.values(None, np.int64, line, last)
+                    if len(values) != tokens.sum():
+                        print('Malformed ply face line in {}.'.format(self.path))
+                        return False
+                    offsets = np.cumsum(tokens) - tokens + listIndex
+                    counts = values[offsets]
+                    triangles.append(fanTriangles(counts, values[gatherRuns(offsets + 1, counts)]))
+                remaining -= last - line
+                line = last
+        if remaining or element < len(elements) - 1:
+            print('Unexpected end of file in {}.'.format(self.path))
+            return False
+        return True
+
+class scanHandRigger:
+
+    def __init__(self, points, triangles):
+        self.points, self.triangles = points, triangles
+        self.adjacency = None
+
+    def getAdjacency(self):
+        '''
+            builds the vertex adjacency of the scan on first use.
+        '''
+        if self.adjacency is None:
+            edges = meshEdges(np.full(len(self.triangles), 3), np.asarray(self.triangles).reshape(-1))
+            self.adjacency = meshAdjacency(edges, len(self.points))
+        return self.adjacency
+
+    def verticesNear(self, position, radius, chunkSize=1 << 20):
+        '''
+            returns the indices of vertices within a radius of a position,
+            scanning the points array in chunks.
+        '''
+        found = []
+        for start in range(0, len(self.points), chunkSize):
+            chunk = np.asarray(self.points[start:start + chunkSize])
+            found.append(np.nonzero(((chunk - position)**2).sum(axis=1) <= radius*radius)[0] + start)
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+    def centroid(self, chunkSize=1 << 20):
+        '''
+            returns the mean of all points, accumulated in chunks.
+        '''
+        total = np.zeros(3)
+        for start in range(0, len(self.points), chunkSize):
+            total += np.asarray(self.points[start:start + chunkSize], dtype=float).sum(axis=0)
+        return tuple((total/max(len(self.points), 1)).tolist())
+
+    def landmarkPosition(self, vertices, refine=True):
+        '''
+            returns the average position of landmark vertices, trimming stray
+            vertices first when refine is set.
+        '''
+        vertices = np.unique(np.asarray(vertices, dtype=np.int64))
+        positions = np.asarray(self.points[vertices], dtype=float)
+        if refine:
+            vertices, positions = self.getAdjacency().refineLandmark(vertices, positions)
+        return tuple(positions.mean(axis=0).tolist())
+
+    def curveSamples(self, cvs, count):
+        '''
+            returns evenly spaced positions along the polyline through the
+            given control vertices, from its first to its last point.
+        '''
+        cvs = np.asarray(cvs, dtype=float)
+        length = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(cvs, axis=0), axis=1))])
+        samples = np.linspace(0.0, length[-1], count)
+        return np.stack([np.interp(samples, length, cvs[:, i]) for i in range(3)], axis=1).tolist()
+
+    def buildSkeleton(self, landmarks, carpalNum=4, chains=None, chainJoints=5):
+        '''
+            converts landmark vertex indices keyed by 'base_joint', 'joint_i'
+            and 'knuckle_i', and optional curve control vertices, into the
+            skeleton description read by paintHandControls.importSkeleton.
+        '''
+        skeleton = {'version': 1, 'carpalNum': carpalNum,
+                    'baseJoint': self.landmarkPosition(landmarks['base_joint']),
+                    'fingerTipPositions': dict(('joint_' + str(i), self.landmarkPosition(landmarks['joint_' + str(i)]))
+                                                for i in range(5)),
+                    'knucklePositions': dict(('knuckle_' + str(i), self.landmarkPosition(landmarks['knuckle_' + str(i)]))
+                                                for i in range(5))}
+        skeleton['chains'] = [self.curveSamples(i, chainJoints) for i in chains or []]
+        return skeleton
+
+    def exportSkeleton(self, skeleton, path):
+        with open(path, 'w') as skeletonFile:
+            json.dump(skeleton, skeletonFile, indent=4)
+
 class ctxControl:
 
     title = 'brushWindow'
@@ -323,7 +1556,6 @@ class ctxControl:
                     self.ctxDetection[contextIndex] = True
                     #set current context to last used tool.
                     cmds.setToolTo(ctxName)
-                    cmds.scriptJob(uiDeleted=[self.brushWin, self.changeToSelectTool])
                 else:
                     return fn(self, *args, **kwargs)
             return ctxWrapper
@@ -335,6 +1567,7 @@ class ctxControl:
         '''
         cmds.setToolTo('selectSuperContext')
 
+    @timedDecorator
     @runAssociatedCtx(ctxNames[0])
     def createCurveDrawCtx(self, *args):
         '''
@@ -345,8 +1578,8 @@ class ctxControl:
         self.currentCtxName = self.ctxNames[0]
         self.ctxDetection[0] = True
         cmds.setToolTo(self.ctxNames[0])
-        cmds.scriptJob(uiDeleted=[self.brushWin, self.changeToSelectTool])
 
+    @timedDecorator
     @runAssociatedCtx(ctxNames[1])
     def createCurveCVCtx(self, *args):
         '''
@@ -357,8 +1590,8 @@ class ctxControl:
         self.currentCtxName = self.ctxNames[1]
         self.ctxDetection[1] = True
         cmds.setToolTo(self.ctxNames[1])
-        cmds.scriptJob(uiDeleted=[self.brushWin, self.changeToSelectTool])
         
+    @timedDecorator
     @runAssociatedCtx(ctxNames[2])
     def createArtSelectCtx(self, *args):
         '''
@@ -370,7 +1603,6 @@ class ctxControl:
         self.currentCtxName = self.ctxNames[2]
         self.ctxDetection[2] = True
         cmds.setToolTo(self.ctxNames[2])    
-        cmds.scriptJob(uiDeleted=[self.brushWin, self.changeToSelectTool])        
         
     def paintControlsDetection(self, *args):
         '''
@@ -395,7 +1627,8 @@ class ctxControl:
                 paintControlDetect[i] = queryPaintControl[i]
             elif queryPaintControl[i] is True:
                 paintControlDetect[i] = True         
-            
+        recordStep('brushControls', attributes=paintControlDetect)
+
         for i in range(3):
             if self.ctxDetection[i]:
                 print( 'ctx {} is activated'.format(self.ctxNames[i]))
@@ -429,6 +1662,17 @@ class ctxControl:
         cmds.checkBox(self.brushWidgets[5], e=True, v=False)
         cmds.checkBox(self.brushWidgets[6], e=True, v=False)
         cmds.checkBox(self.brushWidgets[7], e=True, v=False)
+        self.storeBrushState()
+
+    def storeBrushState(self, *args):
+        '''
+            persists the brush slider and checkbox values between sessions.
+        '''
+        saveState('brush_radius', cmds.floatSliderGrp(self.brushWidgets[0], q=True, v=True))
+        saveState('curve_degree', cmds.intSliderGrp(self.brushWidgets[1], q=True, v=True))
+        saveState('number_joints', cmds.intSliderGrp(self.brushWidgets[2], q=True, v=True))
+        for i in range(3, 8):
+            saveState('brush_checkbox_' + str(i), cmds.checkBox(self.brushWidgets[i], q=True, v=True))
 
     def findNumCarpals(self, *args):
         '''
@@ -436,6 +1680,8 @@ class ctxControl:
         '''
         self.numCarpals = cmds.intSliderGrp(self.brushWidgets[2], q=True, v=True)
         self.changed=True
+        self.storeBrushState()
+        recordStep('carpalSlider', value=self.numCarpals)
 
     def commitChanges(self, *args):
         '''
@@ -445,6 +1691,13 @@ class ctxControl:
         self.changeToSelectTool()
         curveControls = curveCVcontrols()
         if self.ctxDetection[0] or self.ctxDetection[1]:
+            if sessionRecorder.active is not None:
+                curves = [{'cvs': [list(i) for i in cmds.getAttr(shape + '.cv[*]')],
+                            'degree': cmds.getAttr(shape + '.degree')}
+                                for shape in cmds.ls(type='nurbsCurve') if not isHandControl(shape)]
+                recordStep('curveCommit', curves=curves,
+                            numberCarpals=self.numCarpals if self.changed and self.numCarpals else self.defaultNumCarpals)
+            #stores curve control vertices before the curves are deleted.
             try:
                 if self.changed is False:
                     curveControls.createDrawjoints(number_carpals=self.defaultNumCarpals)
@@ -464,10 +1717,20 @@ class ctxControl:
         if cmds.window(windowName, exists=True):
             cmds.deleteUI(windowName)
 
+    @timedDecorator
     def createBrushWindow(self):
         '''
-            creates a separate window for brush controls
+            creates a separate window for brush controls, or shows the
+            existing one when switching between contexts.
         '''
+        if cmds.window(self.title, exists=True) and self.brushWidgets[0] is not None and \
+                cmds.floatSliderGrp(self.brushWidgets[0], exists=True):
+            self.numCarpals = cmds.intSliderGrp(self.brushWidgets[2], q=True, v=True)
+            self.changed = self.numCarpals!=self.defaultNumCarpals
+            #the window may have been built by another ctxControl instance.
+            cmds.showWindow(self.title)
+            return
+
         self.deleteActiveWindows(self.title)
         self.brushWin = cmds.window(self.title, widthHeight=self.widthHeight, resizeToFitChildren=True, sizeable=False, menuBar=True)
 
@@ -477,11 +1740,15 @@ class ctxControl:
         cmds.menuItem(label='About', command=self.information)
         
         cmds.rowColumnLayout(numberOfColumns=1)          
-        self.brushWidgets[0] = cmds.floatSliderGrp(label='Brush Radius:', minValue=0.1, maxValue=10.0, value=0.2, field=True)
-        self.brushWidgets[1] = cmds.intSliderGrp(label='Curve Degree:', minValue=3, maxValue=9, value=5, field=True)  
-        self.brushWidgets[2] = cmds.intSliderGrp(label='Number Joints:', minValue=4, maxValue=9, value=5, field=True,
-                                                    cc= lambda *args: self.findNumCarpals())   
-        self.changed = False
+        self.brushWidgets[0] = cmds.floatSliderGrp(label='Brush Radius:', minValue=0.1, maxValue=10.0, field=True,
+                                                    value=loadState('brush_radius', 0.2), cc=self.storeBrushState)
+        self.brushWidgets[1] = cmds.intSliderGrp(label='Curve Degree:', minValue=3, maxValue=9, field=True,
+                                                    value=loadState('curve_degree', 5), cc=self.storeBrushState)
+        self.brushWidgets[2] = cmds.intSliderGrp(label='Number Joints:', minValue=4, maxValue=9, field=True,
+                                                    value=loadState('number_joints', 5), cc= lambda *args: self.findNumCarpals())   
+        self.numCarpals = loadState('number_joints', 5)
+        self.changed = self.numCarpals!=self.defaultNumCarpals
+        #restored joint counts are committed as if the slider was changed.
         
         cmds.setParent('..')
         
@@ -494,6 +1761,9 @@ class ctxControl:
         self.brushWidgets[6] = cmds.checkBox('Reflection')
         cmds.text('Selection:')
         self.brushWidgets[7] = cmds.checkBox('Select All')
+        for i in range(3, 8):
+            cmds.checkBox(self.brushWidgets[i], e=True, v=loadState('brush_checkbox_' + str(i), False),
+                            cc=self.storeBrushState)
         cmds.setParent('..')
 
         cmds.rowColumnLayout(numberOfColumns=2)
@@ -501,6 +1771,7 @@ class ctxControl:
         cmds.button('Finished Curves', w=self.widthHeight[0]/2, command=self.commitChanges)
 
         cmds.showWindow(self.title)
+        cmds.scriptJob(uiDeleted=[self.brushWin, self.changeToSelectTool])
         
 class mainUI(curveCVcontrols, paintHandControls, ctxControl):
     
@@ -578,6 +1849,9 @@ class mainUI(curveCVcontrols, paintHandControls, ctxControl):
         self.jointWidget, self.knuckleWidget = {}, {}
         self.baseJointWidget = {}
         self.widgets = {}
+        self.recorder = sessionRecorder(self)
+        self.fingerControls = fingerControls()
+        self.lodSkeletons = lodSkeletons()
         self.listOfFingerPos, self.listOfKnucklePos = {}, {}
         for i in range(len(self.joints)): 
             self.listOfFingerPos['joint_' + str(i)] = False   
@@ -591,6 +1865,7 @@ class mainUI(curveCVcontrols, paintHandControls, ctxControl):
             when the user wants to reset values for all commands.
         '''
         cmds.intSliderGrp(self.widgets['number_carpals'], e=True, v=3)
+        self.storeMainState()
         for i in range(1,6): cmds.checkBox(self.jointWidget['joint_' + str(i)], e=True, v=False)
         for i in range(1,6): cmds.checkBox(self.knuckleWidget['knuckle_' + str(i)], e=True, v=False)
         cmds.checkBox(self.baseJointWidget['base_joint'], e=True, v=False)
@@ -644,7 +1919,12 @@ class mainUI(curveCVcontrols, paintHandControls, ctxControl):
                 self.knuckles[j] = False
                 self.listOfKnucklePos['knuckle_' + str(j)] = False 
         #enable relevant joint controls based off user.
-        
+
+        if sessionRecorder.active is not None:
+            recordStep('paintSelection', selection=compressComponents(cmds.ls(sl=True, fl=True)),
+                        joints=list(self.joints), knuckles=list(self.knuckles),
+                        baseJoint=self.baseJoint, carpalNum=queryCarpals)
+        #compresses the selection only while a session is being recorded.
         self.queryJointPressed(carpalNum=queryCarpals)
 
     def unselectAll(self, *args):
@@ -709,6 +1989,109 @@ class mainUI(curveCVcontrols, paintHandControls, ctxControl):
         else:
             print( 'Please make a selection to see changes')     
             
+    def createFingerControls(self, *args):
+        '''
+            creates curl, spread and fist controls for the painted hand joints.
+        '''
+        self.fingerControls.createControls()
+
+    def validateFingerControls(self, *args):
+        '''
+            prints any problems found in the finger control node graph.
+        '''
+        problems = self.fingerControls.validateGraph()
+        for i in problems:
+            print(i)
+        if not problems:
+            print('Finger controls are valid.')
+
+    def importScanSkeleton(self, *args):
+        '''
+            imports a skeleton built headlessly from scan data.
+        '''
+        path = cmds.fileDialog2(fileFilter='Skeleton (*.json)', dialogStyle=2, fileMode=1)
+        if path:
+            self.importSkeleton(path[0])
+
+    def validateRig(self, *args):
+        '''
+            validates the hand rig, against the selected mesh if any, and
+            prints the problems found.
+        '''
+        shapes = cmds.ls(sl=True, dag=True, type='mesh', noIntermediate=True)
+        mesh = cmds.listRelatives(shapes, parent=True) if shapes else None
+        #only mesh transforms are checked against, selected joints or controls are ignored.
+        report = rigValidator().validate(mesh[0] if mesh else None)
+        for check, joints in report['errors'].items():
+            print('{}: {}'.format(check, ', '.join(joints)))
+        print('Hand rig is {}.'.format('valid' if report['valid'] else 'invalid'))
+
+    def validateAssets(self, *args):
+        '''
+            validates the hand rigs of several maya files and saves a json
+            lines report.
+        '''
+        if cmds.file(q=True, modified=True):
+            answer = cmds.confirmDialog(title='Validate Assets', message='Save changes to the current scene?',
+                                        button=['Save', "Don't Save", 'Cancel'], defaultButton='Save',
+                                        cancelButton='Cancel', dismissString='Cancel')
+            if answer == 'Cancel':
+                return
+            if answer == 'Save':
+                if not cmds.file(q=True, sceneName=True):
+                    print('Please save the current scene to continue.')
+                    return
+                cmds.file(save=True)
+        #opening each asset replaces the current scene.
+
+        paths = cmds.fileDialog2(fileFilter='Maya Files (*.ma *.mb)', dialogStyle=2, fileMode=4)
+        if paths:
+            reportPath = cmds.fileDialog2(fileFilter='Report (*.jsonl)', dialogStyle=2, fileMode=0)
+            rigValidator().validateAssets(paths, reportPath[0] if reportPath else None)
+
+    def smoothWeights(self, *args):
+        '''
+            smooths the skin weights of the selected meshes.
+        '''
+        for mesh in cmds.ls(sl=True, objectsOnly=True):
+            smoothSkinWeights(mesh)
+
+    def buildLods(self, *args):
+        '''
+            builds the level of detail skeletons, transferring weights from
+            the selected skinned mesh.
+        '''
+        mesh = cmds.ls(sl=True, objectsOnly=True)
+        self.lodSkeletons.buildLods(mesh[0] if mesh else None)
+
+    def exportLod(self, *args):
+        '''
+            exports the level of detail chosen in the export option menu.
+        '''
+        level = int(cmds.optionMenu(self.widgets['export_lod'], q=True, value=True))
+        path = cmds.fileDialog2(fileFilter='FBX (*.fbx);;Maya ASCII (*.ma);;Maya Binary (*.mb)',
+                                dialogStyle=2, fileMode=0)
+        if path:
+            self.lodSkeletons.exportLod(level, path[0])
+
+    def saveSession(self, *args):
+        '''
+            stops the session recording and saves it to a json log.
+        '''
+        self.recorder.stop()
+        path = cmds.fileDialog2(fileFilter='Session Log (*.json)', dialogStyle=2, fileMode=0)
+        if path:
+            self.recorder.save(path[0])
+
+    def replaySession(self, *args):
+        '''
+            replays a saved session log against the selected mesh.
+        '''
+        path = cmds.fileDialog2(fileFilter='Session Log (*.json)', dialogStyle=2, fileMode=1)
+        if path:
+            mesh = cmds.ls(sl=True, objectsOnly=True)
+            sessionReplay(sessionRecorder().load(path[0])).run(mesh[0] if mesh else None)
+
     def explanation(self, *args):
         '''
             confirm dialog that explains the mechanics of the tools.
@@ -722,30 +2105,64 @@ class mainUI(curveCVcontrols, paintHandControls, ctxControl):
         '''           
         cmds.jointDisplayScale(cmds.floatSliderGrp(self.widgets['joint_display_scale'], q=True, v=True))
     
+    def setDirectory(self, *args):
+        '''
+            prompts for the tool directory and persists it between sessions.
+        '''
+        try:
+            directory = self.queryDirectory()
+        except ValueError:
+            print("Invalid entry. Please enter the correct path")
+            return
+        if directory:
+            ctxControl.queryDirectory = directory
+            saveState('directory', directory)
+        #a cancelled prompt keeps the directory already loaded.
+
+    def storeMainState(self, *args):
+        '''
+            persists the main window slider values between sessions.
+        '''
+        saveState('number_carpals', cmds.intSliderGrp(self.widgets['number_carpals'], q=True, v=True))
+        saveState('joint_display_scale', cmds.floatSliderGrp(self.widgets['joint_display_scale'], q=True, v=True))
+
     @RuntimeErrorDecorator
+    @timedDecorator
     def mainWindow(self):
         '''
             the mainWindow containing all the functionality. 
             Called whenever geometry is selected in the viewport.
         '''
+        ctxControl.queryDirectory = loadState('directory', '')
+        #pasting the script redefines ctxControl, so the directory is always
+        #restored from the persisted state.
+        if not ctxControl.queryDirectory and self.entered is False:
+            self.setDirectory()
+        self.entered = True
+
+        if cmds.window(self.title, exists=True):
+            if self.widgets and cmds.intSliderGrp(self.widgets['number_carpals'], exists=True):
+                cmds.showWindow(self.title)
+                return
+            cmds.deleteUI(self.title, window=True)
+        #reuses the window when this instance built it. A window left by an
+        #earlier paste is rebuilt from the persisted slider values so edited
+        #code takes effect.
+
         paintControls = ctxControl()
         jointControls = paintHandControls()
         curveControls = curveCVcontrols()
 
-        if self.entered is False:
-            try:
-                ctxControl.queryDirectory = self.queryDirectory()
-            except ValueError:
-                print("Invalid entry. Please enter the correct path")
-            self.entered = True
-
-        if cmds.window(self.title, exists=True): 
-            cmds.deleteUI(self.title, window=True)
-
         cmds.window(self.title, widthHeight=self.widthHeight, resizeToFitChildren=True, sizeable=False, menuBar=True)   
         
         cmds.menu(label='File', tearOff=True, allowOptionBoxes=False)
         cmds.menuItem(label='Reset All', command=self.resetAllValues)
+        cmds.menuItem(label='Set Directory...', command=self.setDirectory)
+        cmds.menuItem(label='Import Skeleton...', command=self.importScanSkeleton)
+        cmds.menuItem(divider=True)
+        cmds.menuItem(label='Record Session', command=self.recorder.start)
+        cmds.menuItem(label='Save Session...', command=self.saveSession)
+        cmds.menuItem(label='Replay Session...', command=self.replaySession)
         cmds.menu( label='Help', helpMenu=True )
         cmds.menuItem(label='About', command = self.explanation)
         
@@ -756,6 +2173,8 @@ class mainUI(curveCVcontrols, paintHandControls, ctxControl):
         cmds.button('CV Hand Curves', w=258, command = paintControls.createCurveCVCtx)
         cmds.button('Delete Curves', w=258, command= curveControls.deleteAllCurves)
         cmds.button('Delete Joints', w=258, command=jointControls.deleteAllJoints)
+        cmds.button('Validate Rig', w=258, command=self.validateRig)
+        cmds.button('Validate Assets...', w=258, command=self.validateAssets)
                 
         cmds.setParent('..')
         cmds.setParent('..')
@@ -784,8 +2203,10 @@ class mainUI(curveCVcontrols, paintHandControls, ctxControl):
         
         cmds.setParent('..')
         cmds.rowColumnLayout(numberOfColumns=1)   
-        self.widgets['number_carpals'] = cmds.intSliderGrp(label='No. Carpal Joints:', minValue=4, maxValue=10, value=4, field=True)        
-        self.widgets['joint_display_scale'] = cmds.floatSliderGrp(label='Joint Display:', minValue=0.1, maxValue=0.3, value=0.2, field=True,
+        self.widgets['number_carpals'] = cmds.intSliderGrp(label='No. Carpal Joints:', minValue=4, maxValue=10, field=True,
+                                                            value=loadState('number_carpals', 4), cc=self.storeMainState)
+        self.widgets['joint_display_scale'] = cmds.floatSliderGrp(label='Joint Display:', minValue=0.1, maxValue=0.3, field=True,
+                                                                    value=loadState('joint_display_scale', 0.2), cc=self.storeMainState,
                                                                     dc = lambda *args: self.changeJointDisplaySize(), precision=3)
         cmds.setParent('..')
 
@@ -793,8 +2214,202 @@ class mainUI(curveCVcontrols, paintHandControls, ctxControl):
         cmds.button('Paint Selection', w=172, command=paintControls.createArtSelectCtx)
         cmds.button('Unselect All', w=172, command=self.unselectAll)
         cmds.button('Undo selection', w=172, command=jointControls.undoSelection)
+        cmds.setParent('..')
+
+        cmds.rowColumnLayout(numberOfColumns=3)
+        cmds.button('Finger Controls', w=172, command=self.createFingerControls)
+        cmds.button('Validate Controls', w=172, command=self.validateFingerControls)
+        cmds.button('Smooth Weights', w=172, command=self.smoothWeights)
+        cmds.setParent('..')
+
+        cmds.rowColumnLayout(numberOfColumns=3)
+        cmds.button('Build LODs', w=172, command=self.buildLods)
+        self.widgets['export_lod'] = cmds.optionMenu(label='Export LOD:', w=172)
+        for i in range(len(lodSkeletons.lodLevels) + 1):
+            cmds.menuItem(label=str(i))
+        cmds.button('Export LOD...', w=172, command=self.exportLod)
         
-        cmds.showWindow(self.title)       
+        cmds.showWindow(self.title)
+
+#-------------------------SESSION RECORDING-----------------------
+def compressComponents(components):
+    '''
+        compresses a flattened component selection into index ranges
+        i.e ['hand.f[1]', 'hand.f[2]', 'hand.f[3]'] -> {'hand.f': [[1, 3]]}.
+    '''
+    indices = {}
+    for i in components:
+        match = re.match(r'(.*)\[(\d+)\]$', i)
+        if match is None:
+            indices.setdefault(i, [])
+        else:
+            indices.setdefault(match.group(1), []).append(int(match.group(2)))
+
+    compressed = {}
+    for component, values in indices.items():
+        ranges = []
+        for value in sorted(set(values)):
+            if ranges and value == ranges[-1][1] + 1:
+                ranges[-1][1] = value
+            else:
+                ranges.append([value, value])
+        compressed[component] = ranges
+    return compressed
+
+def expandComponents(compressed, mesh=None):
+    '''
+        expands compressed index ranges back into selectable component
+        strings. If a mesh is given, the recorded mesh name is replaced.
+    '''
+    components = []
+    for component, ranges in compressed.items():
+        if mesh is not None:
+            component = mesh + component[component.find('.'):] if '.' in component else mesh
+        if not ranges:
+            components.append(component)
+        for start, end in ranges:
+            components.append('{}[{}:{}]'.format(component, start, end))
+    return components
+
+def recordStep(kind, **payload):
+    '''
+        appends a step to the active session recorder, if any.
+    '''
+    if sessionRecorder.active is not None:
+        sessionRecorder.active.record(kind, **payload)
+
+class sessionRecorder:
+
+    active = None
+    #recorder currently capturing tool inputs.
+
+    def __init__(self, rig=None):
+        self.steps = []
+        self.rig = rig
+        #main window whose painted landmarks are captured when recording starts.
+
+    def start(self, *args):
+        '''
+            starts capturing tool inputs into this recorder, beginning with
+            the landmarks already painted so a replay can reach createJoints.
+        '''
+        self.steps = []
+        if self.rig is not None:
+            position = lambda value: list(value) if value else False
+            self.record('initialState', joints=list(self.rig.joints), knuckles=list(self.rig.knuckles),
+                        baseJoint=self.rig.baseJoint, baseJointPos=position(self.rig.baseJointPos),
+                        fingerPositions=dict((i, position(j)) for i, j in self.rig.listOfFingerPos.items()),
+                        knucklePositions=dict((i, position(j)) for i, j in self.rig.listOfKnucklePos.items()))
+        sessionRecorder.active = self
+        print('Session recording started.')
+
+    def stop(self, *args):
+        '''
+            stops capturing tool inputs.
+        '''
+        if sessionRecorder.active is self:
+            sessionRecorder.active = None
+        print('Session recording stopped with {} steps.'.format(len(self.steps)))
+
+    def record(self, kind, **payload):
+        '''
+            stores a single tool input step.
+        '''
+        payload['kind'] = kind
+        self.steps.append(payload)
+
+    def save(self, path):
+        '''
+            writes the recorded steps to a compact json log.
+        '''
+        with open(path, 'w') as logFile:
+            json.dump({'version': 1, 'steps': self.steps}, logFile, separators=(',', ':'))
+
+    def load(self, path):
+        '''
+            reads the recorded steps from a json log.
+        '''
+        with open(path) as logFile:
+            self.steps = json.load(logFile)['steps']
+        return self.steps
+
+class sessionReplay:
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.timings = []
+        self.rig = mainUI()
+        self.rig.joints, self.rig.knuckles = [False]*5, [False]*5
+
+    def run(self, mesh=None):
+        '''
+            re-runs every recorded step headlessly against the given mesh
+            and times each step.
+        '''
+        self.timings = []
+        for index, step in enumerate(self.steps):
+            handler = getattr(self, 'replay' + step['kind'][0].upper() + step['kind'][1:], None)
+            if handler is None:
+                continue
+            #interactive only steps, such as brush edits, are skipped.
+            start = time.perf_counter()
+            handler(step, mesh)
+            elapsed = time.perf_counter() - start
+            self.timings.append({'step': index, 'kind': step['kind'], 'seconds': elapsed})
+            print('step {} ({}): {:.4f}s'.format(index, step['kind'], elapsed))
+        return self.timings
+
+    def replayInitialState(self, step, mesh):
+        '''
+            restores the landmarks and checkbox state captured when the
+            recording started.
+        '''
+        position = lambda value: tuple(value) if value else False
+        self.rig.joints[:], self.rig.knuckles[:] = step['joints'], step['knuckles']
+        self.rig.baseJoint, self.rig.baseJointPos = step['baseJoint'], position(step['baseJointPos'])
+        self.rig.listOfFingerPos = dict((i, position(j)) for i, j in step['fingerPositions'].items())
+        self.rig.listOfKnucklePos = dict((i, position(j)) for i, j in step['knucklePositions'].items())
+
+    def replayPaintSelection(self, step, mesh):
+        '''
+            restores the recorded selection and checkbox state, then
+            queries the painted joints.
+        '''
+        cmds.select(expandComponents(step['selection'], mesh), replace=True)
+        self.rig.joints[:], self.rig.knuckles[:] = step['joints'], step['knuckles']
+        self.rig.baseJoint = step['baseJoint']
+        if not self.rig.baseJoint:
+            self.rig.baseJointPos = False
+        self.rig.queryJointPressed(carpalNum=step['carpalNum'])
+
+    def replayCurveCommit(self, step, mesh):
+        '''
+            redraws the recorded curves and creates their joints.
+        '''
+        for curve in step['curves']:
+            cmds.curve(p=curve['cvs'], d=curve['degree'])
+        curveCVcontrols().createDrawjoints(number_carpals=step['numberCarpals'])
+
+    def save(self, path):
+        '''
+            writes the per step timings to a json benchmark file.
+        '''
+        with open(path, 'w') as timingFile:
+            json.dump(self.timings, timingFile, indent=4)
+
+    def compare(self, path, tolerance=1.5):
+        '''
+            compares the current timings against a saved benchmark and
+            returns the steps slower than the tolerated ratio.
+        '''
+        with open(path) as timingFile:
+            baseline = {i['step']: i['seconds'] for i in json.load(timingFile)}
+        regressions = [i for i in self.timings
+                        if i['step'] in baseline and i['seconds'] > baseline[i['step']]*tolerance]
+        for i in regressions:
+            print('step {} ({}) regressed: {:.4f}s against {:.4f}s'.format(i['step'], i['kind'],
+                                                                        i['seconds'], baseline[i['step']]))
+        return regressions
 
 if __name__=='__main__':
     mainUse = mainUI()